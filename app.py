@@ -1,9 +1,17 @@
 from flask import Flask, g, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Response, stream_template, get_flashed_messages
+from flask.json.provider import DefaultJSONProvider
 from markupsafe import Markup
-import sqlite3, os
-import bleach
+from jinja2 import FileSystemBytecodeCache
+import sqlite3, os, queue, threading, atexit, hashlib
+import nh3
+import orjson
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -13,23 +21,110 @@ ALLOWED_ATTRIBUTES = {}  # No attributes allowed for security
 DB_PATH = BASE_DIR / "data.db"
 SECRET_KEY = os.environ.get("CC_SECRET", "dev-secret-key")
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON provider with orjson doing the encoding and decoding.
+
+    jsonify() and the session cookie both go through this. Keys stay sorted
+    and debug responses stay indented, as with the stdlib provider.
+    orjson has no object_hook, so loads() calls that pass one (the session
+    serializer untagging tuples, Markup etc.) still use the stdlib decoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
 app = Flask(__name__, static_folder='static', template_folder='templates')
+app.json = OrjsonProvider(app)
+# Keep compiled templates across worker restarts (mod_wsgi recycles processes).
+# Jinja keys them on the template source and stores them in its own per-user
+# temp directory, which is always writable.
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 app.config['SECRET_KEY'] = SECRET_KEY
 app.config['DATABASE'] = str(DB_PATH)
+# CC_READ_POOL_SIZE: number of pooled read-only SQLite connections
+app.config['READ_POOL_SIZE'] = int(os.environ.get('CC_READ_POOL_SIZE', min(os.cpu_count() or 2, 8)))
 # Admin configuration: allow an admin override controlled by env var
 # CC_ALLOW_ADMIN_OVERRIDE: 'True'/'1'/'yes' to enable
 # CC_ADMIN_USERS: comma-separated list of admin usernames (defaults to 'admin')
 app.config['ALLOW_ADMIN_OVERRIDE'] = os.environ.get('CC_ALLOW_ADMIN_OVERRIDE', 'false').lower() in ('1', 'true', 'yes')
 app.config['ADMIN_USERS'] = [u.strip() for u in os.environ.get('CC_ADMIN_USERS', 'admin').split(',') if u.strip()]
 
+# Hot read queries, shared across routes so each pooled connection prepares
+# them once and then serves them from its statement cache.
+SQL_GET_COTTAGE = "SELECT * FROM cottages WHERE id = ?"
+# rating_sum/rating_count are maintained by the ratings triggers in schema.sql;
+# derive the total and average here so rows can go to templates unmodified.
+_RATING_COLUMNS = (
+    "c.rating_sum AS rating_total, "
+    "CASE WHEN c.rating_sum > 0 THEN ROUND(CAST(c.rating_sum AS REAL) / c.rating_count, 1) ELSE 0 END AS rating_avg"
+)
+# Only what list.html renders: the description and review summary can be
+# large and are never shown on the list
+SQL_COTTAGES_BY_VOTES = (
+    "SELECT c.id, c.name, c.location, c.price, c.image, c.url, c.votes, c.rating_count, "
+    f"{_RATING_COLUMNS}, r.rating AS my_rating FROM cottages c "
+    "LEFT JOIN ratings r ON r.cottage_id = c.id AND r.user_name = ? "
+    "ORDER BY c.votes DESC, c.id LIMIT ? OFFSET ?"
+)
+# Likewise for results.html and compare.html; the detail and edit pages show
+# every column and keep SQL_GET_COTTAGE's SELECT *
+SQL_COTTAGES_RESULTS = (
+    f"SELECT c.id, c.name, c.location, c.votes, {_RATING_COLUMNS}, c.rating_count "
+    "FROM cottages c ORDER BY c.votes DESC, c.name ASC"
+)
+SQL_COTTAGES_BY_NAME = (
+    "SELECT c.id, c.name, c.location, c.price, c.beds, c.image, c.url, c.submitted_by, c.votes, "
+    "c.dogs_allowed, c.hottub, c.secure_garden, c.ev_charging, c.parking, c.log_burner, "
+    f"c.high_chair, c.cot, {_RATING_COLUMNS}, c.rating_count FROM cottages c ORDER BY c.name"
+)
+SQL_COTTAGE_COMMENTS = "SELECT * FROM comments WHERE cottage_id = ? ORDER BY created_at DESC"
+SQL_COTTAGE_VOTES = "SELECT id, user_name, voted_at FROM votes WHERE cottage_id = ? ORDER BY voted_at DESC"
+# Same rounding as the list pages (SQL ROUND is half away from zero,
+# Python's round() is half to even)
+SQL_RATING_STATS = f"SELECT c.rating_count, {_RATING_COLUMNS} FROM cottages c WHERE c.id = ?"
+SQL_MY_RATING = "SELECT rating, rated_at FROM ratings WHERE cottage_id = ? AND user_name = ?"
+SQL_RESULTS_VOTERS = (
+    "SELECT c.id, c.name, c.votes, v.user_name, v.voted_at "
+    "FROM cottages c LEFT JOIN votes v ON v.cottage_id = c.id "
+    "ORDER BY c.votes DESC, c.id, v.voted_at DESC"
+)
+# Columns written from the add/edit cottage forms; the amenities are
+# checkboxes posting '1' or '0'
+AMENITY_FIELDS = ('hottub', 'secure_garden', 'ev_charging', 'parking', 'log_burner', 'high_chair', 'cot')
+COTTAGE_FORM_COLUMNS = ('name', 'location', 'price', 'beds', 'dogs_allowed', 'image', 'url',
+                        'description') + AMENITY_FIELDS
+SQL_INSERT_COTTAGE = (
+    f"INSERT INTO cottages ({', '.join(COTTAGE_FORM_COLUMNS)}, submitted_by) "
+    f"VALUES ({', '.join(':' + c for c in COTTAGE_FORM_COLUMNS)}, :submitted_by)"
+)
+SQL_UPDATE_COTTAGE = f"UPDATE cottages SET {', '.join(f'{c}=:{c}' for c in COTTAGE_FORM_COLUMNS)} WHERE id=:id"
+STATEMENT_CACHE_SIZE = 256
+# Cottage cards per /cottages page (a multiple of the 2- and 3-column grids)
+PAGE_SIZE = 24
+# Beyond this the OFFSET no longer fits in SQLite's 64-bit INTEGER
+MAX_PAGE = (2**63 - 1) // PAGE_SIZE
+# UPDATE ... RETURNING arrived in SQLite 3.35; older system libraries (still
+# common under distro mod_wsgi builds) get a follow-up SELECT instead
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+
+# nh3 wants sets; disallowed tags are stripped and their text kept, except
+# for <script>/<style>, whose contents are dropped as well
+_NH3_TAGS = set(ALLOWED_TAGS)
 
 def sanitize_html(text):
     """Clean and sanitize HTML input"""
-    cleaned = bleach.clean(text or '', 
-                         tags=ALLOWED_TAGS,
-                         attributes=ALLOWED_ATTRIBUTES,
-                         strip=True)
-    return cleaned
+    return nh3.clean(text or '', tags=_NH3_TAGS, attributes=ALLOWED_ATTRIBUTES)
 
 
 @app.context_processor
@@ -41,65 +136,327 @@ def inject_now():
         'admin_users': app.config.get('ADMIN_USERS', [])
     }
 
+def _configure_connection(db):
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("PRAGMA busy_timeout=5000")
+    db.execute("PRAGMA temp_store=MEMORY")
+    db.execute("PRAGMA cache_size=-20000")
+    db.execute("PRAGMA mmap_size=268435456")
+
+
+class WriteConn:
+    """The single read-write connection; writers serialise on ``lock``."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False,
+                                    cached_statements=STATEMENT_CACHE_SIZE)
+        # journal_mode=WAL is persisted in the database file, so setting it
+        # once here (before any reader opens) covers the whole process.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        _configure_connection(self.conn)
+        apply_schema(self.conn)
+        self.conn.commit()
+        # only the writer needs this; readers are query_only
+        self.conn.execute("PRAGMA foreign_keys=ON")
+
+
+class ReadPool:
+    """Pool of read-only connections reused across requests.
+
+    Up to ``size`` connections are kept. When all of them are checked out,
+    get() opens a temporary extra one, which put() closes again.
+    """
+
+    def __init__(self, path, size):
+        self.uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+        self.size = size
+        self._idle = queue.Queue(maxsize=size)
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._probe = None
+        self._probe_lock = threading.Lock()
+
+    def _connect(self):
+        db = sqlite3.connect(self.uri, uri=True, check_same_thread=False,
+                             cached_statements=STATEMENT_CACHE_SIZE)
+        _configure_connection(db)
+        # belt and braces with mode=ro: readers never write
+        db.execute("PRAGMA query_only=ON")
+        return db
+
+    def get(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return self._connect()
+        # More requests in flight than pooled readers (mod_wsgi runs 15
+        # threads by default): WAL readers don't block each other, so
+        # opening one more beats making the request wait
+        return self._connect()
+
+    def data_version(self):
+        """A number that changes whenever anything, in any process, commits.
+
+        PRAGMA data_version only moves for other connections' commits, so it
+        is asked of a dedicated connection that never writes.
+        """
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = self._connect()
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def put(self, db):
+        try:
+            self._idle.put_nowait(db)
+        except queue.Full:
+            # an overflow connection from get()
+            db.close()
+
+    def close_all(self):
+        if self._probe is not None:
+            self._probe.close()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_write_conn = None
+_read_pool = None
+_pool_init_lock = threading.Lock()
+
+def _get_pools():
+    global _write_conn, _read_pool
+    if _read_pool is None:
+        with _pool_init_lock:
+            if _read_pool is None:
+                # The writer must exist first so the file is in WAL mode
+                # (and created, on a fresh install) before readers open it.
+                _write_conn = WriteConn(app.config['DATABASE'])
+                _read_pool = ReadPool(app.config['DATABASE'], app.config['READ_POOL_SIZE'])
+    return _write_conn, _read_pool
+
+
+@atexit.register
+def close_pools():
+    # Runs on interpreter shutdown, which is how gunicorn/mod_wsgi workers
+    # exit on SIGTERM; connections still checked out are left to the OS.
+    if _read_pool is not None:
+        _read_pool.close_all()
+    if _write_conn is not None and _write_conn.lock.acquire(timeout=5):
+        _write_conn.conn.close()
+
+
 def get_db():
+    """Return this request's read-only connection, checked out of the pool."""
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(app.config['DATABASE'])
-        db.row_factory = sqlite3.Row
+        db = g._database = _get_pools()[1].get()
     return db
 
+
+@contextmanager
+def writer_transaction(db):
+    """Run the block in a BEGIN IMMEDIATE transaction; commit or roll back on exit.
+
+    Taking the write lock up front avoids SQLITE_BUSY when a deferred
+    transaction later tries to upgrade from reading to writing.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+
+@contextmanager
+def get_writer():
+    """Hold the shared write connection inside a writer_transaction()."""
+    writer = _get_pools()[0]
+    with writer.lock, writer_transaction(writer.conn) as db:
+        yield db
+
+
+_result_cache = {}
+
+def cached_result(key, build):
+    """Return build()'s result, reused until the database next changes.
+
+    Keyed on ReadPool.data_version(), so writes from other worker processes
+    invalidate it too. Results must not depend on the session.
+    """
+    version = _get_pools()[1].data_version()
+    hit = _result_cache.get(key)
+    if hit and hit[0] == version:
+        return hit[1]
+    # the version was read before building, so a write that lands mid-build
+    # leaves the entry already stale
+    result = build()
+    _result_cache[key] = (version, result)
+    return result
+
+
+def rating_stats(db, cottage_id):
+    """Rating count/average/total for one cottage, from its denormalised columns."""
+    row = db.execute(SQL_RATING_STATS, (cottage_id,)).fetchone()
+    if row is None:
+        return {'count': 0, 'average': 0, 'total': 0}
+    return {
+        'count': row['rating_count'] or 0,
+        'average': row['rating_avg'],
+        'total': row['rating_total'] or 0
+    }
+
 @app.route('/reviews/<int:cottage_id>')
 def reviews(cottage_id):
     db = get_db()
-    cottage = db.execute('SELECT * FROM cottages WHERE id = ?', (cottage_id,)).fetchone()
+    cottage = db.execute(SQL_GET_COTTAGE, (cottage_id,)).fetchone()
     if cottage is None:
         flash('Cottage not found')
         return redirect(url_for('cottages'))
     
     # Get all comments/reviews
-    comments = db.execute(
-        "SELECT * FROM comments WHERE cottage_id = ? ORDER BY created_at DESC",
-        (cottage_id,)
-    ).fetchall()
+    comments = db.execute(SQL_COTTAGE_COMMENTS, (cottage_id,)).fetchall()
     
     # Get rating statistics
-    stats = db.execute(
-        "SELECT COUNT(*) as count, AVG(rating) as avg, SUM(rating) as total FROM ratings WHERE cottage_id = ?",
-        (cottage_id,)
-    ).fetchone()
+    stats = rating_stats(db, cottage_id)
     
     # Get current user's rating if logged in
     my_rating = None
     if session.get('user_name'):
-        my_rating = db.execute(
-            "SELECT rating, rated_at FROM ratings WHERE cottage_id = ? AND user_name = ?",
-            (cottage_id, session['user_name'])
-        ).fetchone()
+        my_rating = db.execute(SQL_MY_RATING, (cottage_id, session['user_name'])).fetchone()
     
     return render_template(
         'reviews.html',
-        cottage=dict(cottage),
-        comments=[dict(c) for c in comments],
-        stats=dict(stats),
-        my_rating=dict(my_rating) if my_rating else None
+        cottage=cottage,
+        comments=comments,
+        stats=stats,
+        my_rating=my_rating
     )
 
+def release_db():
+    """Return this request's reader to the pool, if it checked one out."""
+    db = g.pop('_database', None)
+    if db is not None:
+        _get_pools()[1].put(db)
+
+
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+    release_db()
+
+
+def migrate_db(db, schema):
+    """Bring a database created by an older schema.sql up to date."""
+    columns = {r['name'] for r in db.execute("PRAGMA table_info(cottages)")}
+    if 'rating_sum' not in columns:
+        # sqlite3 doesn't open a transaction for DDL by itself; without this
+        # the ALTERs would commit on their own and a crash before the
+        # backfill would leave the columns added but zeroed
+        with writer_transaction(db):
+            db.execute("ALTER TABLE cottages ADD COLUMN rating_sum INTEGER DEFAULT 0")
+            db.execute("ALTER TABLE cottages ADD COLUMN rating_count INTEGER DEFAULT 0")
+            db.execute(
+                """UPDATE cottages SET
+                    rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM ratings WHERE cottage_id = cottages.id),
+                    rating_count = (SELECT COUNT(*) FROM ratings WHERE cottage_id = cottages.id)"""
+            )
+
+    # Foreign keys need cottages.id to be a real key, and deleting a cottage
+    # relies on its comments, votes and ratings cascading with it
+    stale = []
+    if not any(r['name'] == 'id' and r['pk'] for r in db.execute("PRAGMA table_info(cottages)")):
+        # a hand-built cottages table with a plain "id INTEGER" column (which
+        # also handed new cottages a NULL id)
+        stale.append('cottages')
+    for table in ('comments', 'votes', 'ratings'):
+        # ratings predates schema.sql and was made by hand, so it may have no
+        # foreign key at all
+        fks = db.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+        if not fks or any(fk['on_delete'] != 'CASCADE' for fk in fks):
+            stale.append(table)
+    if stale:
+        rebuild_tables(db, schema, stale)
+
+
+def rebuild_tables(db, schema, tables):
+    """Recreate ``tables`` from schema.sql, keeping their rows.
+
+    SQLite can't change keys or constraints in place, so each table is renamed
+    aside, created afresh and refilled. Rows pointing at a cottage that no
+    longer exists are dropped on the way, since foreign keys would reject them.
+    """
+    definitions = sqlite3.connect(':memory:')
+    definitions.executescript(schema)
+    # Both PRAGMAs are no-ops inside a transaction. legacy_alter_table stops
+    # the renames rewriting other tables' REFERENCES cottages(id).
+    db.execute("PRAGMA foreign_keys=OFF")
+    db.execute("PRAGMA legacy_alter_table=ON")
+    try:
+        with writer_transaction(db):
+            for table in tables:
+                old = f"_old_{table}"
+                seq = db.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+                db.execute(f"ALTER TABLE {table} RENAME TO {old}")
+                db.execute(definitions.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()[0])
+                old_columns = {r['name'] for r in db.execute(f"PRAGMA table_info({old})")}
+                cols = ', '.join(r[1] for r in definitions.execute(f"PRAGMA table_info({table})")
+                                 if r[1] in old_columns)
+                where = '' if table == 'cottages' else ' WHERE cottage_id IN (SELECT id FROM cottages)'
+                db.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {old}{where}")
+                db.execute(f"DROP TABLE {old}")
+                if seq is not None:
+                    # don't let AUTOINCREMENT reissue ids from before the rebuild
+                    db.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+                    db.execute(f"INSERT INTO sqlite_sequence (name, seq) SELECT ?, MAX(?, COALESCE(MAX(id), 0)) FROM {table}",
+                               (table, seq['seq']))
+            db.execute("DELETE FROM ratings WHERE cottage_id NOT IN (SELECT id FROM cottages)")
+    finally:
+        db.execute("PRAGMA legacy_alter_table=OFF")
+        db.execute("PRAGMA foreign_keys=ON")
+        definitions.close()
+    # indexes and triggers were dropped along with the old tables
+    run_schema(db, schema)
+
+
+def run_schema(db, schema):
+    """Run schema.sql as one transaction: a single commit, and all or nothing."""
+    try:
+        db.executescript(f"BEGIN IMMEDIATE;\n{schema}\nCOMMIT;")
+    except BaseException:
+        db.rollback()
+        raise
 
 
-def init_db():
+def apply_schema(db):
     schema_file = BASE_DIR / 'schema.sql'
     if not schema_file.exists():
         raise FileNotFoundError("schema.sql not found in project directory.")
     with open(schema_file, 'r') as f:
         schema = f.read()
-    db = get_db()
-    db.executescript(schema)
-    db.commit()
+    run_schema(db, schema)
+    migrate_db(db, schema)
+
+
+def init_db():
+    writer = _get_pools()[0]
+    # Only the lock: apply_schema() runs its own transactions, and
+    # run_schema()'s executescript would commit any we opened around it
+    with writer.lock:
+        apply_schema(writer.conn)
+        # refresh planner statistics so the indexes above get used
+        writer.conn.execute("ANALYZE")
 
 
 @app.route('/init')
@@ -146,36 +503,24 @@ def rate_cottage(cottage_id):
     except ValueError:
         return jsonify({'ok': False, 'message': 'Invalid rating value.'}), 400  # Fixed: added closing }
 
-    db = get_db()
-    
-    # Check if cottage exists
-    cottage = db.execute("SELECT id FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
-    if not cottage:
-        return jsonify({'ok': False, 'message': 'Cottage not found.'}), 404
-
-    # Insert or replace rating (UNIQUE constraint on cottage_id, user_name)
-    db.execute(
-        """INSERT INTO ratings (cottage_id, user_name, rating, rated_at)
-           VALUES (?, ?, ?, ?)
-           ON CONFLICT(cottage_id, user_name) 
-           DO UPDATE SET rating=excluded.rating, rated_at=excluded.rated_at""",
-        (cottage_id, current_user, rating, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-    )
-    db.commit()
+    with get_writer() as db:
+        # Insert or replace rating (UNIQUE constraint on cottage_id, user_name);
+        # the foreign key rejects an unknown cottage
+        try:
+            db.execute(
+                """INSERT INTO ratings (cottage_id, user_name, rating, rated_at)
+                   VALUES (?, ?, ?, datetime('now', 'localtime'))
+                   ON CONFLICT(cottage_id, user_name) 
+                   DO UPDATE SET rating=excluded.rating, rated_at=excluded.rated_at""",
+                (cottage_id, current_user, rating)
+            )
+        except sqlite3.IntegrityError:
+            return jsonify({'ok': False, 'message': 'Cottage not found.'}), 404
 
-    # Fetch updated stats
-    stats = db.execute(
-        "SELECT COUNT(*) as count, AVG(rating) as avg, SUM(rating) as total FROM ratings WHERE cottage_id = ?",
-        (cottage_id,)
-    ).fetchone()
+        # Fetch updated stats
+        stats = rating_stats(db, cottage_id)
 
-    return jsonify({
-        'ok': True,
-        'rating': rating,
-        'count': stats['count'],
-        'average': round(stats['avg'], 1) if stats['avg'] else 0,
-        'total': stats['total'] or 0
-    })
+    return jsonify({'ok': True, 'rating': rating, **stats})
 
 
 @app.route('/rating/delete/<int:cottage_id>', methods=['POST'])
@@ -185,28 +530,19 @@ def delete_rating(cottage_id):
     if not current_user:
         return jsonify({'ok': False, 'message': 'Not logged in.'}), 401
 
-    db = get_db()
-    result = db.execute(
-        "DELETE FROM ratings WHERE cottage_id = ? AND user_name = ?",
-        (cottage_id, current_user)
-    )
-    db.commit()
+    with get_writer() as db:
+        result = db.execute(
+            "DELETE FROM ratings WHERE cottage_id = ? AND user_name = ?",
+            (cottage_id, current_user)
+        )
 
-    if result.rowcount == 0:
-        return jsonify({'ok': False, 'message': 'No rating found to delete.'}), 404
+        if result.rowcount == 0:
+            return jsonify({'ok': False, 'message': 'No rating found to delete.'}), 404
 
-    # Fetch updated stats
-    stats = db.execute(
-        "SELECT COUNT(*) as count, AVG(rating) as avg, SUM(rating) as total FROM ratings WHERE cottage_id = ?",
-        (cottage_id,)
-    ).fetchone()
+        # Fetch updated stats
+        stats = rating_stats(db, cottage_id)
 
-    return jsonify({
-        'ok': True,
-        'count': stats['count'],
-        'average': round(stats['avg'], 1) if stats['avg'] else 0,
-        'total': stats['total'] or 0
-    })
+    return jsonify({'ok': True, **stats})
 
 
 @app.route('/ratings/<int:cottage_id>')
@@ -218,22 +554,16 @@ def cottage_ratings(cottage_id):
         return redirect(url_for('join'))
 
     db = get_db()
-    cottage = db.execute("SELECT * FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
+    cottage = db.execute(SQL_GET_COTTAGE, (cottage_id,)).fetchone()
     if not cottage:
         flash('Cottage not found.')
         return redirect(url_for('cottages'))
 
     # Get user's own rating
-    my_rating = db.execute(
-        "SELECT rating, rated_at FROM ratings WHERE cottage_id = ? AND user_name = ?",
-        (cottage_id, current_user)
-    ).fetchone()
+    my_rating = db.execute(SQL_MY_RATING, (cottage_id, current_user)).fetchone()
 
     # Get aggregate stats
-    stats = db.execute(
-        "SELECT COUNT(*) as count, AVG(rating) as avg, SUM(rating) as total FROM ratings WHERE cottage_id = ?",
-        (cottage_id,)
-    ).fetchone()
+    stats = rating_stats(db, cottage_id)
 
     # Admins can see all ratings
     all_ratings = []
@@ -246,9 +576,9 @@ def cottage_ratings(cottage_id):
     return render_template(
         'ratings.html',
         cottage=cottage,
-        my_rating=dict(my_rating) if my_rating else None,
-        stats=dict(stats),
-        all_ratings=[dict(r) for r in all_ratings],
+        my_rating=my_rating,
+        stats=stats,
+        all_ratings=all_ratings,
         is_admin=is_admin()
     )
 
@@ -263,94 +593,98 @@ def index():
     return redirect(url_for('join'))
 
 
+def stream_page(template_name, **context):
+    """Render a template as a streamed response.
+
+    Flashed messages are popped from the session up front: the session cookie
+    goes out with the headers, before base.html gets to consume them.
+    """
+    get_flashed_messages()
+    # The context is already fetched; hand the reader back now rather than
+    # holding it until the last byte reaches a slow client
+    release_db()
+    return Response(stream_template(template_name, **context))
+
+
 @app.route('/cottages')
 def cottages():
+    page = max(request.args.get('page', 1, type=int), 1)
+    if page > MAX_PAGE:
+        return "Not found", 404
     db = get_db()
-    rows = db.execute("SELECT * FROM cottages ORDER BY votes DESC").fetchall()
-    cottages_list = [dict(r) for r in rows]
-    
-    # Add rating stats to each cottage
-    for c in cottages_list:
-        stats = db.execute(
-            "SELECT COUNT(*) as count, AVG(rating) as avg, SUM(rating) as total FROM ratings WHERE cottage_id = ?",
-            (c['id'],)
-        ).fetchone()
-        c['rating_count'] = stats['count']
-        c['rating_avg'] = round(stats['avg'], 1) if stats['avg'] else 0
-        c['rating_total'] = stats['total'] or 0
-        
-        # Get current user's rating if logged in
-        if session.get('user_name'):
-            my_rating = db.execute(
-                "SELECT rating FROM ratings WHERE cottage_id = ? AND user_name = ?",
-                (c['id'], session['user_name'])
-            ).fetchone()
-            c['my_rating'] = my_rating['rating'] if my_rating else None
-        else:
-            c['my_rating'] = None
-    
-    return render_template('list.html', cottages=cottages_list)
+    # my_rating is the current user's rating (NULL when logged out); one
+    # extra row tells us whether there is a next page
+    rows = db.execute(SQL_COTTAGES_BY_VOTES,
+                      (session.get('user_name'), PAGE_SIZE + 1, (page - 1) * PAGE_SIZE)).fetchall()
+    if not rows and page > 1:
+        # past the last page
+        return "Not found", 404
+    return stream_page('list.html', cottages=rows[:PAGE_SIZE], page=page,
+                       has_next=len(rows) > PAGE_SIZE)
 
 
 @app.route('/cottage/<int:cottage_id>', methods=['GET', 'POST'])
 def cottage_detail(cottage_id):
-    db = get_db()
     if request.method == 'POST':
         author = session.get('user_name', 'Guest')
         text = request.form.get('comment', '').strip()
         if text:
-            db.execute("INSERT INTO comments (cottage_id, author, text) VALUES (?, ?, ?)",
-                       (cottage_id, author, text))
-            db.commit()
+            with get_writer() as db:
+                try:
+                    # local time, like votes and ratings; the templates print it as is
+                    db.execute("INSERT INTO comments (cottage_id, author, text, created_at) "
+                               "VALUES (?, ?, ?, datetime('now', 'localtime'))",
+                               (cottage_id, author, text))
+                except sqlite3.IntegrityError:
+                    # foreign key: no such cottage
+                    return "Not found", 404
             flash('Comment posted')
         return redirect(url_for('cottage_detail', cottage_id=cottage_id))
 
-    cottage = db.execute("SELECT * FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
+    db = get_db()
+    cottage = db.execute(SQL_GET_COTTAGE, (cottage_id,)).fetchone()
     if not cottage:
         return "Not found", 404
 
-    comments = db.execute(
-        "SELECT * FROM comments WHERE cottage_id = ? ORDER BY created_at DESC", (cottage_id,)
-    ).fetchall()
-
-    votes = db.execute(
-        "SELECT id, user_name, voted_at FROM votes WHERE cottage_id = ? ORDER BY voted_at DESC", (cottage_id,)
-    ).fetchall()
+    comments = db.execute(SQL_COTTAGE_COMMENTS, (cottage_id,)).fetchall()
 
-    return render_template('details.html', c=cottage, comments=comments, votes=votes)
+    votes = db.execute(SQL_COTTAGE_VOTES, (cottage_id,)).fetchall()
+    # The voter list is already here, so read "have I voted?" off it rather
+    # than mirroring votes in the session cookie
+    current_user = session.get('user_name')
+    has_voted = current_user is not None and any(v['user_name'] == current_user for v in votes)
+
+    return render_template('details.html', c=cottage, comments=comments, votes=votes, has_voted=has_voted)
+
+
+def cottage_form_fields():
+    """Read the add/edit cottage form into a dict keyed by column name.
+
+    The description is rendered with |safe, so it is sanitised here for both.
+    """
+    get = request.form.get
+    fields = {
+        'name': get('name', '').strip(),
+        'location': get('location', '').strip(),
+        'price': get('price', '').strip(),
+        'beds': int(get('beds') or 1),
+        'dogs_allowed': 1 if get('dogs', '') == 'yes' else 0,
+        'image': get('image', '').strip(),
+        'url': get('url', '').strip(),
+        'description': sanitize_html(get('description', '').strip()),
+    }
+    for f in AMENITY_FIELDS:
+        fields[f] = int(get(f, '0'))
+    return fields
 
 
 @app.route('/add', methods=['GET', 'POST'])
 def add_cottage():
     if request.method == 'POST':
-        name = request.form.get('name', '').strip()
-        location = request.form.get('location', '').strip()
-        price = request.form.get('price', '').strip()
-        beds = int(request.form.get('beds') or 1)
-        dogs = 1 if request.form.get('dogs', '') == 'yes' else 0
-        image = request.form.get('image', '').strip()
-        url = request.form.get('url', '').strip()
-        description = request.form.get('description', '').strip()
-        submitted_by = session.get('user_name', 'Guest')
-        
-        # Get the new boolean fields
-        hottub = int(request.form.get('hottub', '0'))
-        secure_garden = int(request.form.get('secure_garden', '0'))
-        ev_charging = int(request.form.get('ev_charging', '0'))
-        parking = int(request.form.get('parking', '0'))
-        log_burner = int(request.form.get('log_burner', '0'))
-        high_chair = int(request.form.get('high_chair', '0'))
-        cot = int(request.form.get('cot', '0'))
-        
-        db = get_db()
-        db.execute(
-            "INSERT INTO cottages (name, location, price, beds, dogs_allowed, image, url, description, "
-            "submitted_by, hottub, secure_garden, ev_charging, parking, log_burner, high_chair, cot) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (name, location, price, beds, dogs, image, url, description, submitted_by, 
-             hottub, secure_garden, ev_charging, parking, log_burner, high_chair, cot)
-        )
-        db.commit()
+        fields = cottage_form_fields()
+        fields['submitted_by'] = session.get('user_name', 'Guest')
+        with get_writer() as db:
+            db.execute(SQL_INSERT_COTTAGE, fields)
         flash('Cottage suggestion added')
         return redirect(url_for('cottages'))
     return render_template('add.html')
@@ -358,44 +692,48 @@ def add_cottage():
 
 @app.route('/vote/<int:cottage_id>', methods=['POST'])
 def vote(cottage_id):
-    db = get_db()
     # Require a logged-in user (no anonymous/Guest votes)
     current_user = session.get('user_name')
     if not current_user:
         return jsonify({'status': 'not_logged_in', 'message': 'Please join the voting group to vote.'}), 401
 
-    # Check if this user already has a vote recorded (one vote per user across all cottages)
-    existing = db.execute("SELECT id, cottage_id FROM votes WHERE user_name = ?", (current_user,)).fetchone()
-    if existing:
-        # If they already voted for this cottage, return appropriate message
-        if existing['cottage_id'] == cottage_id:
-            row = db.execute("SELECT votes FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
-            return jsonify({'status': 'already_voted', 'votes': row['votes']}), 400
+    with get_writer() as db:
+        # One vote per user across all cottages: UNIQUE(user_name) turns a repeat
+        # vote into a no-op
+        try:
+            inserted = db.execute(
+                "INSERT INTO votes (cottage_id, user_name, voted_at) "
+                "VALUES (?, ?, datetime('now', 'localtime')) "
+                "ON CONFLICT(user_name) DO NOTHING",
+                (cottage_id, current_user)
+            ).rowcount
+        except sqlite3.IntegrityError:
+            # foreign key: no such cottage
+            return jsonify({'status': 'not_found', 'message': 'Cottage not found.'}), 404
+        if not inserted:
+            # Fetch the existing vote together with its cottage's count
+            existing = db.execute(
+                "SELECT v.id, v.cottage_id, c.votes FROM votes v "
+                "LEFT JOIN cottages c ON c.id = v.cottage_id WHERE v.user_name = ?",
+                (current_user,)
+            ).fetchone()
+            # If they already voted for this cottage, return appropriate message
+            if existing['cottage_id'] == cottage_id:
+                return jsonify({'status': 'already_voted', 'votes': existing['votes']}), 400
+            else:
+                # They voted for a different cottage - instruct them to delete first
+                return jsonify({'status': 'already_voted_elsewhere', 'cottage_id': existing['cottage_id'], 'vote_id': existing['id']}), 400
+
+        # Bump the counter and read the new count back, in one statement
+        # where RETURNING is available
+        if HAS_RETURNING:
+            row = db.execute(
+                "UPDATE cottages SET votes = votes + 1 WHERE id = ? RETURNING votes", (cottage_id,)
+            ).fetchone()
         else:
-            # They voted for a different cottage - instruct them to delete first
-            return jsonify({'status': 'already_voted_elsewhere', 'cottage_id': existing['cottage_id'], 'vote_id': existing['id']}), 400
-
-    # Proceed to record the vote
-    try:
-        db.execute("UPDATE cottages SET votes = votes + 1 WHERE id = ?", (cottage_id,))
-        voted_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        db.execute("INSERT INTO votes (cottage_id, user_name, voted_at) VALUES (?, ?, ?)",
-                   (cottage_id, current_user, voted_at))
-        db.commit()
-    except sqlite3.IntegrityError:
-        # Unique constraint on user_name prevented duplicate voting
-        row = db.execute("SELECT votes FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
-        return jsonify({'status': 'already_voted', 'votes': row['votes']}), 400
-
-    # Fetch new vote count
-    row = db.execute("SELECT votes FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
-    new_count = row['votes']
-
-    # Update session list for faster client-side feedback (optional)
-    voted = session.get('voted', [])
-    if cottage_id not in voted:
-        voted.append(cottage_id)
-        session['voted'] = voted
+            db.execute("UPDATE cottages SET votes = votes + 1 WHERE id = ?", (cottage_id,))
+            row = db.execute("SELECT votes FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
+        new_count = row['votes']
 
     return jsonify({'status': 'ok', 'votes': new_count})
 
@@ -414,42 +752,14 @@ def edit_cottage(cottage_id):
         return redirect(url_for('cottage_detail', cottage_id=cottage_id))
 
     if request.method == 'POST':
-        name = request.form.get('name', '').strip()
-        location = request.form.get('location', '').strip()
-        price = request.form.get('price', '').strip()
-        beds = int(request.form.get('beds') or 1)
-        dogs = 1 if request.form.get('dogs', '') == 'yes' else 0
-        image = request.form.get('image', '').strip()
-        url = request.form.get('url', '').strip()
-        description = request.form.get('description', '').strip()
-        
-        # Sanitize HTML content
-        description = sanitize_html(description)
-        
-        # Get the boolean fields
-        hottub = int(request.form.get('hottub', '0'))
-        secure_garden = int(request.form.get('secure_garden', '0'))
-        ev_charging = int(request.form.get('ev_charging', '0'))
-        parking = int(request.form.get('parking', '0'))
-        log_burner = int(request.form.get('log_burner', '0'))
-        high_chair = int(request.form.get('high_chair', '0'))
-        cot = int(request.form.get('cot', '0'))
-        
-        db.execute(
-            """UPDATE cottages SET 
-                name=?, location=?, price=?, beds=?, dogs_allowed=?, 
-                image=?, url=?, description=?, hottub=?, secure_garden=?,
-                ev_charging=?, parking=?, log_burner=?, high_chair=?, cot=?
-                WHERE id=?""",
-            (name, location, price, beds, dogs, image, url, description,
-             hottub, secure_garden, ev_charging, parking, log_burner, 
-             high_chair, cot, cottage_id)
-        )
-        db.commit()
+        fields = cottage_form_fields()
+        fields['id'] = cottage_id
+        with get_writer() as wdb:
+            wdb.execute(SQL_UPDATE_COTTAGE, fields)
         flash('Cottage details updated')
         return redirect(url_for('cottage_detail', cottage_id=cottage_id))
 
-    cottage = db.execute("SELECT * FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
+    cottage = db.execute(SQL_GET_COTTAGE, (cottage_id,)).fetchone()
     if not cottage:
         return "Not found", 404
     return render_template('edit.html', cottage=cottage)
@@ -457,25 +767,21 @@ def edit_cottage(cottage_id):
 
 @app.route('/delete/<int:cottage_id>', methods=['POST'])
 def delete_cottage(cottage_id):
-    db = get_db()
-    # Only the user who submitted the cottage can delete it
-    row = db.execute("SELECT submitted_by FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
-    if not row:
-        flash('Cottage not found')
-        return redirect(url_for('cottages'))
-    current_user = session.get('user_name', 'Guest')
-    # allow admin override if enabled in config
-    is_admin = app.config.get('ALLOW_ADMIN_OVERRIDE', False) and current_user in app.config.get('ADMIN_USERS', [])
-    if row['submitted_by'] != current_user and not is_admin:
-        flash('Not authorized to delete this cottage')
-        return redirect(url_for('cottage_detail', cottage_id=cottage_id))
-
-    # Remove related data first
-    db.execute("DELETE FROM comments WHERE cottage_id = ?", (cottage_id,))
-    db.execute("DELETE FROM votes WHERE cottage_id = ?", (cottage_id,))
-    # Remove the cottage itself
-    db.execute("DELETE FROM cottages WHERE id = ?", (cottage_id,))
-    db.commit()
+    with get_writer() as db:
+        # Only the user who submitted the cottage can delete it
+        row = db.execute("SELECT submitted_by FROM cottages WHERE id = ?", (cottage_id,)).fetchone()
+        if not row:
+            flash('Cottage not found')
+            return redirect(url_for('cottages'))
+        current_user = session.get('user_name', 'Guest')
+        # allow admin override if enabled in config
+        is_admin = app.config.get('ALLOW_ADMIN_OVERRIDE', False) and current_user in app.config.get('ADMIN_USERS', [])
+        if row['submitted_by'] != current_user and not is_admin:
+            flash('Not authorized to delete this cottage')
+            return redirect(url_for('cottage_detail', cottage_id=cottage_id))
+
+        # Its comments, votes and ratings go with it (ON DELETE CASCADE)
+        db.execute("DELETE FROM cottages WHERE id = ?", (cottage_id,))
     flash('Cottage deleted')
     return redirect(url_for('cottages'))
 
@@ -483,45 +789,43 @@ def delete_cottage(cottage_id):
 # --- Comment edit/delete routes ---
 @app.route('/comment/edit/<int:comment_id>', methods=['POST'])
 def edit_comment(comment_id):
-    db = get_db()
     text = request.form.get('text', '').strip()
-    # find cottage_id and author for redirect and permission check
-    row = db.execute("SELECT cottage_id, author FROM comments WHERE id = ?", (comment_id,)).fetchone()
-    if not row:
-        flash('Comment not found')
-        return redirect(url_for('cottages'))
-    cottage_id = row['cottage_id']
-    comment_author = row['author']
-    current_user = session.get('user_name', 'Guest')
-    if comment_author != current_user:
-        flash('Not authorized to edit this comment')
-        return redirect(url_for('cottage_detail', cottage_id=cottage_id))
+    with get_writer() as db:
+        # find cottage_id and author for redirect and permission check
+        row = db.execute("SELECT cottage_id, author FROM comments WHERE id = ?", (comment_id,)).fetchone()
+        if not row:
+            flash('Comment not found')
+            return redirect(url_for('cottages'))
+        cottage_id = row['cottage_id']
+        comment_author = row['author']
+        current_user = session.get('user_name', 'Guest')
+        if comment_author != current_user:
+            flash('Not authorized to edit this comment')
+            return redirect(url_for('cottage_detail', cottage_id=cottage_id))
 
-    if text:
-        # Keep the author as the original author
-        db.execute("UPDATE comments SET text = ? WHERE id = ?", (text, comment_id))
-        db.commit()
-        flash('Comment updated')
+        if text:
+            # Keep the author as the original author
+            db.execute("UPDATE comments SET text = ? WHERE id = ?", (text, comment_id))
+            flash('Comment updated')
     return redirect(url_for('cottage_detail', cottage_id=cottage_id))
 
 
 @app.route('/comment/delete/<int:comment_id>', methods=['POST'])
 def delete_comment(comment_id):
-    db = get_db()
-    row = db.execute("SELECT cottage_id, author FROM comments WHERE id = ?", (comment_id,)).fetchone()
-    if not row:
-        flash('Comment not found')
-        return redirect(url_for('cottages'))
-    cottage_id = row['cottage_id']
-    comment_author = row['author']
-    current_user = session.get('user_name', 'Guest')
-    is_admin = app.config.get('ALLOW_ADMIN_OVERRIDE', False) and current_user in app.config.get('ADMIN_USERS', [])
-    if comment_author != current_user and not is_admin:
-        flash('Not authorized to delete this comment')
-        return redirect(url_for('cottage_detail', cottage_id=cottage_id))
-
-    db.execute("DELETE FROM comments WHERE id = ?", (comment_id,))
-    db.commit()
+    with get_writer() as db:
+        row = db.execute("SELECT cottage_id, author FROM comments WHERE id = ?", (comment_id,)).fetchone()
+        if not row:
+            flash('Comment not found')
+            return redirect(url_for('cottages'))
+        cottage_id = row['cottage_id']
+        comment_author = row['author']
+        current_user = session.get('user_name', 'Guest')
+        is_admin = app.config.get('ALLOW_ADMIN_OVERRIDE', False) and current_user in app.config.get('ADMIN_USERS', [])
+        if comment_author != current_user and not is_admin:
+            flash('Not authorized to delete this comment')
+            return redirect(url_for('cottage_detail', cottage_id=cottage_id))
+
+        db.execute("DELETE FROM comments WHERE id = ?", (comment_id,))
     flash('Comment deleted')
     return redirect(url_for('cottage_detail', cottage_id=cottage_id))
 
@@ -531,19 +835,17 @@ def delete_vote(vote_id):
     if not session.get("user_name"):
         return jsonify({"ok": False, "message": "Not logged in"}), 403
 
-    db = get_db()
-    row = db.execute("SELECT id, user_name, cottage_id FROM votes WHERE id = ?", (vote_id,)).fetchone()
-    if not row:
-        return jsonify({"ok": False, "message": "Vote not found"}), 404
+    with get_writer() as db:
+        row = db.execute("SELECT id, user_name, cottage_id FROM votes WHERE id = ?", (vote_id,)).fetchone()
+        if not row:
+            return jsonify({"ok": False, "message": "Vote not found"}), 404
 
-    # Use the same admin check everywhere
-    if (_norm(row["user_name"]) != _norm(session.get("user_name"))) and (not is_admin()):
-        return jsonify({"ok": False, "message": "Not permitted"}), 403
+        # Use the same admin check everywhere
+        if (_norm(row["user_name"]) != _norm(session.get("user_name"))) and (not is_admin()):
+            return jsonify({"ok": False, "message": "Not permitted"}), 403
 
-    # If you denormalize votes into cottages.votes, keep this; otherwise remove it.
-    db.execute("UPDATE cottages SET votes = CASE WHEN votes > 0 THEN votes - 1 ELSE 0 END WHERE id = ?", (row["cottage_id"],))
-    db.execute("DELETE FROM votes WHERE id = ?", (vote_id,))
-    db.commit()
+        # the votes_ad trigger decrements cottages.votes
+        db.execute("DELETE FROM votes WHERE id = ?", (vote_id,))
 
     return jsonify({"ok": True, "cottage_id": row["cottage_id"], "vote_id": vote_id})
 
@@ -552,14 +854,19 @@ def delete_vote(vote_id):
 def _norm(name: str) -> str:
     return (name or "").strip().casefold()
 
-def get_admins():
-    # CC_ADMINS env var: "Alice,Bob"
-    env_list = [_norm(u) for u in os.environ.get("CC_ADMINS", "").split(",") if u.strip()]
-    cfg_list = [_norm(u) for u in app.config.get("ADMIN_USERS", [])]
-    return set(env_list + cfg_list)
+# CC_ADMINS env var: "Alice,Bob" (plus ADMIN_USERS above); both are fixed at
+# import, so normalise them once
+ADMINS = frozenset(
+    [_norm(u) for u in os.environ.get("CC_ADMINS", "").split(",") if u.strip()]
+    + [_norm(u) for u in app.config.get("ADMIN_USERS", [])]
+)
 
 def is_admin():
-    return _norm(session.get("user_name")) in get_admins()
+    # asked by the context processor and most routes; answer once per request
+    v = g.get('_is_admin')
+    if v is None:
+        v = g._is_admin = _norm(session.get("user_name")) in ADMINS
+    return v
 
 @app.context_processor
 def inject_admin_flags():
@@ -568,35 +875,13 @@ def inject_admin_flags():
 
 @app.route('/results')
 def results():
-    db = get_db()
-    rows = db.execute('SELECT * FROM cottages ORDER BY votes DESC, name ASC').fetchall()
-    cottages = [dict(r) for r in rows]
-
-    # Add rating stats to each cottage
-    for c in cottages:
-        stats = db.execute(
-            "SELECT COUNT(*) as count, AVG(rating) as avg, SUM(rating) as total FROM ratings WHERE cottage_id = ?",
-            (c['id'],)
-        ).fetchone()
-        c['rating_count'] = stats['count']
-        c['rating_avg'] = round(stats['avg'], 1) if stats['avg'] else 0
-        c['rating_total'] = stats['total'] or 0
-
-    total_votes = db.execute('SELECT COUNT(*) AS c FROM votes').fetchone()['c']
-
-    my_vote = None
-    if session.get('user_name'):
-        rv = db.execute('SELECT id, cottage_id FROM votes WHERE user_name=?', (session['user_name'],)).fetchone()
-        if rv:
-            my_vote = dict(rv)
-
-    vote_rows = db.execute('SELECT id, cottage_id, user_name FROM votes').fetchall()
-    votes_by_cottage = {}
-    for r in vote_rows:
-        d = dict(r)
-        votes_by_cottage.setdefault(d['cottage_id'], []).append(d)
+    cottages, votes_by_cottage, votes_by_user = cached_result('results', _results_rows)
+    current_user = session.get('user_name')
+    my_vote = votes_by_user.get(current_user) if current_user else None
+    # one vote per user (UNIQUE(user_name))
+    total_votes = len(votes_by_user)
 
-    return render_template(
+    return stream_page(
         'results.html',
         cottages=cottages,
         total_votes=total_votes,
@@ -605,67 +890,78 @@ def results():
         votes_by_cottage=votes_by_cottage
     )
 
+
+def _results_rows():
+    db = get_db()
+    # results.html walks the list twice (desktop and mobile layouts)
+    cottages = db.execute(SQL_COTTAGES_RESULTS).fetchall()
+    # Group the sqlite3.Row objects as-is (templates index them by key), and
+    # index them by voter so each request can pick out its own vote
+    votes_by_cottage = {}
+    votes_by_user = {}
+    for r in db.execute('SELECT id, cottage_id, user_name FROM votes'):
+        votes_by_cottage.setdefault(r['cottage_id'], []).append(r)
+        votes_by_user[r['user_name']] = r
+    return cottages, votes_by_cottage, votes_by_user
+
+
 @app.route('/compare')
 def compare():
-    db = get_db()
-    rows = db.execute("SELECT * FROM cottages ORDER BY name").fetchall()
-    cottages = [dict(r) for r in rows]
-    
-    # Add rating stats to each cottage
-    for c in cottages:
-        stats = db.execute(
-            "SELECT COUNT(*) as count, AVG(rating) as avg, SUM(rating) as total FROM ratings WHERE cottage_id = ?",
-            (c['id'],)
-        ).fetchone()
-        c['rating_count'] = stats['count']
-        c['rating_avg'] = round(stats['avg'], 1) if stats['avg'] else 0
-        c['rating_total'] = stats['total'] or 0
-    
-    return render_template('compare.html', cottages=cottages)
+    # compare.html walks the list once per table row
+    cottages = cached_result('compare', lambda: get_db().execute(SQL_COTTAGES_BY_NAME).fetchall())
+    return stream_page('compare.html', cottages=cottages)
 
 @app.route('/results_data')
 def results_data():
-    db = get_db()
-    cottages = db.execute("SELECT * FROM cottages ORDER BY votes DESC").fetchall()
-    cottages_list = []
-    for c in cottages:
-   
+    # Same JSON for every visitor, so serve the cached bytes between writes;
+    # pollers that send back the ETag get an empty 304
+    body, etag = cached_result('results_data', _results_json)
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
 
-        voters_raw = db.execute(
-        "SELECT user_name, voted_at FROM votes WHERE cottage_id = ?",
-        (c['id'],)
-        ).fetchall()
 
-    voters = []
-    for v in voters_raw:
-    # Convert the string from SQLite to datetime
-        voted_at_dt = datetime.strptime(v['voted_at'], '%Y-%m-%d %H:%M:%S')
-        voters.append({
-        'user_name': v['user_name'],
-        'voted_at': voted_at_dt
-    })
-
-        
+def _results_json():
+    db = get_db()
+    rows = db.execute(SQL_RESULTS_VOTERS).fetchall()
+    cottages_list = []
+    # one row per (cottage, voter), so group consecutive rows by cottage
+    for _, group in groupby(rows, key=itemgetter('id')):
+        group = list(group)
+        c = group[0]
         cottages_list.append({
             'id': c['id'],
             'name': c['name'],
             'votes': c['votes'],
-            'voters': [{'user_name': v['user_name'], 'voted_at': v['voted_at']} for v in voters]
+            'voters': [{'user_name': v['user_name'], 'voted_at': v['voted_at']}
+                       for v in group if v['user_name'] is not None]
         })
     top = cottages_list[0]['name'] if cottages_list else None
     top_votes = cottages_list[0]['votes'] if cottages_list else 0
-    return jsonify({'top': top, 'top_votes': top_votes, 'cottages': cottages_list})
+    body = jsonify({'top': top, 'top_votes': top_votes, 'cottages': cottages_list}).get_data()
+    # hashed from the content rather than data_version, whose value is only
+    # meaningful per connection, so every worker hands out the same tag
+    return body, hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _slide_files(slides_dir, mtime_ns):
+    # mtime_ns is only part of the cache key: adding or removing a slide
+    # changes the directory mtime, which forces a fresh listing
+    return tuple(sorted(f for f in os.listdir(slides_dir) if f.endswith(('.png', '.jpg'))))
 
 
 @app.route('/presentation')
 def view_presentation():
     # Get a list of slide images from the static/slides directory
     slides_dir = os.path.join(app.static_folder, 'slides')
-    if os.path.exists(slides_dir):
-        slides = sorted([f for f in os.listdir(slides_dir) if f.endswith('.png') or f.endswith('.jpg')])
-        slide_paths = [url_for('static', filename=f'slides/{slide}') for slide in slides]
-    else:
+    try:
+        mtime_ns = os.stat(slides_dir).st_mtime_ns
+    except FileNotFoundError:
         slide_paths = []
+    else:
+        slides = _slide_files(slides_dir, mtime_ns)
+        slide_paths = [url_for('static', filename=f'slides/{slide}') for slide in slides]
     
     return render_template('presentation.html', 
                          slides=slide_paths,
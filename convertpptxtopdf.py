@@ -1,5 +1,7 @@
 import os
+import re
 import sys
+import tempfile
 import win32com.client
 from pathlib import Path
 
@@ -18,18 +20,27 @@ def convert_pptx_to_images():
     try:
         # Initialize PowerPoint
         powerpoint = win32com.client.Dispatch('PowerPoint.Application')
-        powerpoint.Visible = True  # Make PowerPoint visible for debugging
+        powerpoint.DisplayAlerts = 1  # ppAlertsNone
         
-        # Open the presentation
+        # Open the presentation read-only and without a window (PowerPoint
+        # won't let the application itself be hidden, but a windowless
+        # presentation skips all the repainting)
         print("Opening PowerPoint presentation...")
-        presentation = powerpoint.Presentations.Open(str(input_path))
+        presentation = powerpoint.Presentations.Open(str(input_path), True, False, False)
         print(f"Found {presentation.Slides.Count} slides")
         
-        # Export each slide
-        for i in range(1, presentation.Slides.Count + 1):
-            image_path = output_dir / f'slide-{i:03d}.png'
-            print(f"Exporting slide {i} to {image_path}")
-            presentation.Slides(i).Export(str(image_path), 'PNG')
+        # Export every slide in one call. PowerPoint names the files
+        # Slide1.PNG, Slide2.PNG, ... (the word is localised), so export to a
+        # scratch folder and rename them by their slide number.
+        with tempfile.TemporaryDirectory(dir=output_dir) as tmp:
+            presentation.Export(tmp, 'PNG')
+            for exported in Path(tmp).iterdir():
+                if exported.suffix.lower() != '.png':
+                    continue
+                i = int(re.search(r'(\d+)$', exported.stem).group(1))
+                image_path = output_dir / f'slide-{i:03d}.png'
+                print(f"Saving slide {i} to {image_path}")
+                os.replace(exported, image_path)
             
         print("Conversion completed successfully!")
         
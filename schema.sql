@@ -9,21 +9,71 @@ CREATE TABLE IF NOT EXISTS cottages (
   description TEXT,
   submitted_by TEXT,
   votes INTEGER DEFAULT 0,
+  rating_sum INTEGER DEFAULT 0,
+  rating_count INTEGER DEFAULT 0,
   ai_review_summary TEXT,
-  created_at DATETIME DEFAULT (datetime('now'))
+  created_at DATETIME DEFAULT (datetime('now')),
+  url TEXT,
+  hottub INTEGER DEFAULT 0,
+  secure_garden INTEGER DEFAULT 0,
+  ev_charging INTEGER DEFAULT 0,
+  parking INTEGER DEFAULT 0,
+  log_burner INTEGER DEFAULT 0,
+  high_chair INTEGER DEFAULT 0,
+  cot INTEGER DEFAULT 0
 );
 CREATE TABLE IF NOT EXISTS comments (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   cottage_id INTEGER NOT NULL,
   author TEXT,
   text TEXT,
-  created_at DATETIME DEFAULT (datetime('now')),
-  FOREIGN KEY (cottage_id) REFERENCES cottages(id)
+  created_at DATETIME DEFAULT (datetime('now', 'localtime')),
+  FOREIGN KEY (cottage_id) REFERENCES cottages(id) ON DELETE CASCADE
 );
 CREATE TABLE IF NOT EXISTS votes (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   cottage_id INTEGER NOT NULL,
   user_name TEXT NOT NULL UNIQUE,
-  voted_at DATETIME DEFAULT (datetime('now')),
-  FOREIGN KEY (cottage_id) REFERENCES cottages(id)
-);
\ No newline at end of file
+  voted_at DATETIME DEFAULT (datetime('now', 'localtime')),
+  FOREIGN KEY (cottage_id) REFERENCES cottages(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS ratings (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  cottage_id INTEGER NOT NULL,
+  user_name TEXT NOT NULL,
+  rating INTEGER NOT NULL CHECK(rating >= 0 AND rating <= 10),
+  rated_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+  FOREIGN KEY (cottage_id) REFERENCES cottages(id) ON DELETE CASCADE,
+  UNIQUE(cottage_id, user_name)
+);
+
+-- UNIQUE(cottage_id, user_name) on ratings and UNIQUE(user_name) on votes
+-- already give SQLite an index for those lookups.
+CREATE INDEX IF NOT EXISTS idx_ratings_user ON ratings(user_name);
+-- Detail page voter list: "WHERE cottage_id = ? ORDER BY voted_at DESC"
+CREATE INDEX IF NOT EXISTS idx_votes_cottage_voted ON votes(cottage_id, voted_at DESC);
+-- Serves the detail page's "WHERE cottage_id = ? ORDER BY created_at DESC"
+-- without a sort step.
+CREATE INDEX IF NOT EXISTS idx_comments_cottage_created ON comments(cottage_id, created_at DESC);
+
+-- Keep cottages.rating_sum/rating_count in step with ratings, the same way
+-- cottages.votes mirrors the votes table.
+CREATE TRIGGER IF NOT EXISTS ratings_ai AFTER INSERT ON ratings BEGIN
+  UPDATE cottages SET rating_sum = rating_sum + NEW.rating, rating_count = rating_count + 1
+  WHERE id = NEW.cottage_id;
+END;
+CREATE TRIGGER IF NOT EXISTS ratings_ad AFTER DELETE ON ratings BEGIN
+  UPDATE cottages SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+  WHERE id = OLD.cottage_id;
+END;
+CREATE TRIGGER IF NOT EXISTS ratings_au AFTER UPDATE OF rating ON ratings BEGIN
+  UPDATE cottages SET rating_sum = rating_sum - OLD.rating + NEW.rating
+  WHERE id = NEW.cottage_id;
+END;
+
+-- cottages.votes is incremented by vote() itself (UPDATE ... RETURNING hands
+-- it the new count); removing a vote decrements it here.
+CREATE TRIGGER IF NOT EXISTS votes_ad AFTER DELETE ON votes BEGIN
+  UPDATE cottages SET votes = CASE WHEN votes > 0 THEN votes - 1 ELSE 0 END
+  WHERE id = OLD.cottage_id;
+END;
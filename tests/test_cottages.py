@@ -0,0 +1,78 @@
+import os
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as cottage_app
+
+
+class CottagesPagingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        # the connection pools open lazily, so this must be set before the
+        # first request
+        cottage_app.app.config['DATABASE'] = os.path.join(cls.tmp.name, 'data.db')
+        cottage_app.app.config['TESTING'] = True
+        cottage_app.app.config['READ_POOL_SIZE'] = 1
+        cls.client = cottage_app.app.test_client()
+        # one more than a page; votes cycle 1, 2, 0 so the id and vote orders differ
+        cls.count = cottage_app.PAGE_SIZE + 1
+        with cottage_app.get_writer() as db:
+            db.executemany("INSERT INTO cottages (id, name, votes) VALUES (?, ?, ?)",
+                           [(i, f'Cottage {i}', i % 3) for i in range(1, cls.count + 1)])
+        cls.expected = sorted(range(1, cls.count + 1), key=lambda i: (-(i % 3), i))
+
+    @classmethod
+    def tearDownClass(cls):
+        cottage_app.close_pools()
+        cottage_app._write_conn = cottage_app._read_pool = None
+        cottage_app._result_cache.clear()
+        cls.tmp.cleanup()
+
+    def cards(self, html):
+        return [int(i) for i in re.findall(r'vote-count" data-cottage-id="(\d+)"', html)]
+
+    def test_first_page(self):
+        response = self.client.get('/cottages')
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        self.assertEqual(self.cards(html), self.expected[:cottage_app.PAGE_SIZE])
+        self.assertIn('Next', html)
+        self.assertNotIn('Previous', html)
+
+    def test_last_page(self):
+        response = self.client.get('/cottages?page=2')
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        self.assertEqual(self.cards(html), self.expected[cottage_app.PAGE_SIZE:])
+        self.assertIn('Previous', html)
+        self.assertNotIn('Next', html)
+
+    def test_page_past_the_end(self):
+        self.assertEqual(self.client.get('/cottages?page=3').status_code, 404)
+
+    def test_page_offset_too_large_for_sqlite(self):
+        for page in (cottage_app.MAX_PAGE, cottage_app.MAX_PAGE + 1, 10**20):
+            with self.subTest(page=page):
+                self.assertEqual(self.client.get(f'/cottages?page={page}').status_code, 404)
+
+    def test_streamed_page_releases_its_reader(self):
+        # the one pooled reader goes back before the body is sent, so a
+        # second request doesn't need another
+        held = self.client.get('/cottages', buffered=False)
+        try:
+            self.assertEqual(self.client.get('/cottages').status_code, 200)
+            pool = cottage_app._read_pool
+            self.assertEqual(pool._idle.qsize(), pool._opened)
+        finally:
+            held.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as cottage_app
+
+
+class ReadPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, 'data.db')
+        self.writer = cottage_app.WriteConn(path)
+        self.pool = cottage_app.ReadPool(path, 1)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.writer.conn.close()
+        self.tmp.cleanup()
+
+    def test_exhausted_pool_opens_an_overflow_connection(self):
+        first = self.pool.get()
+        second = self.pool.get()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.execute("SELECT COUNT(*) FROM cottages").fetchone()[0], 0)
+        self.pool.put(first)
+        self.pool.put(second)
+        # only the pooled connection is kept; the overflow one is closed
+        self.assertIs(self.pool.get(), first)
+        with self.assertRaises(Exception):
+            second.execute("SELECT 1")
+
+
+class RatingStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.writer = cottage_app.WriteConn(os.path.join(self.tmp.name, 'data.db'))
+
+    def tearDown(self):
+        self.writer.conn.close()
+        self.tmp.cleanup()
+
+    def test_average_rounds_like_the_list_pages(self):
+        db = self.writer.conn
+        db.execute("INSERT INTO cottages (name) VALUES ('a')")
+        # 17 / 4 = 4.25: round() would give 4.2
+        db.executemany("INSERT INTO ratings (cottage_id, user_name, rating) VALUES (1, ?, ?)",
+                       [('w', 5), ('x', 4), ('y', 4), ('z', 4)])
+        db.commit()
+        listed = db.execute(cottage_app.SQL_COTTAGES_RESULTS).fetchone()['rating_avg']
+        self.assertEqual(cottage_app.rating_stats(db, 1), {'count': 4, 'average': 4.3, 'total': 17})
+        self.assertEqual(listed, 4.3)
+
+
+# The shape of the shipped data.db: cottages built by hand with a plain
+# "id INTEGER", the original comments/votes without cascades, a hand-made
+# ratings table, and none of the denormalised rating columns
+LEGACY_SCHEMA = """
+CREATE TABLE cottages (id INTEGER, name TEXT, location TEXT, price TEXT, beds INTEGER,
+  dogs_allowed INTEGER, image TEXT, description TEXT, submitted_by TEXT, votes INTEGER,
+  created_at DATETIME, url TEXT, hottub INTEGER, secure_garden INTEGER, ev_charging INTEGER,
+  parking INTEGER, log_burner INTEGER, high_chair INTEGER, cot INTEGER, ai_review_summary TEXT);
+CREATE TABLE comments (id INTEGER PRIMARY KEY AUTOINCREMENT, cottage_id INTEGER NOT NULL,
+  author TEXT, text TEXT, created_at DATETIME DEFAULT (datetime('now')),
+  FOREIGN KEY (cottage_id) REFERENCES cottages(id));
+CREATE TABLE votes (id INTEGER PRIMARY KEY AUTOINCREMENT, cottage_id INTEGER NOT NULL,
+  user_name TEXT NOT NULL UNIQUE, voted_at DATETIME DEFAULT (datetime('now')),
+  FOREIGN KEY (cottage_id) REFERENCES cottages(id));
+CREATE TABLE ratings (id INTEGER PRIMARY KEY AUTOINCREMENT, cottage_id INTEGER NOT NULL REFERENCES cottages(id),
+  user_name TEXT NOT NULL, rating INTEGER NOT NULL, rated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE(cottage_id, user_name));
+
+INSERT INTO cottages (id, name, votes) VALUES (1, 'Llwydiarth', 1), (2, 'Tyddyn', 0), (3, 'Bryn', 0);
+-- cottage 99 no longer exists
+INSERT INTO comments (cottage_id, author, text) VALUES (1, 'a', 'x'), (2, 'b', 'y'), (99, 'c', 'z');
+INSERT INTO votes (cottage_id, user_name) VALUES (1, 'a'), (99, 'b');
+INSERT INTO ratings (cottage_id, user_name, rating) VALUES (1, 'a', 4), (1, 'b', 6), (2, 'a', 5), (99, 'c', 3);
+-- rows were deleted in the past, so the sequences run ahead of MAX(id)
+UPDATE sqlite_sequence SET seq = 20 WHERE name = 'comments';
+UPDATE sqlite_sequence SET seq = 30 WHERE name = 'votes';
+UPDATE sqlite_sequence SET seq = 40 WHERE name = 'ratings';
+"""
+
+
+class MigrateLegacyDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, 'data.db')
+        legacy = sqlite3.connect(path)
+        legacy.executescript(LEGACY_SCHEMA)
+        legacy.close()
+        # opening the writer applies schema.sql and migrates
+        self.writer = cottage_app.WriteConn(path)
+        self.db = self.writer.conn
+
+    def tearDown(self):
+        self.writer.conn.close()
+        self.tmp.cleanup()
+
+    def rows(self, sql):
+        return [tuple(r) for r in self.db.execute(sql)]
+
+    def test_rows_kept_and_orphans_dropped(self):
+        self.assertEqual(self.rows("SELECT id, name, votes FROM cottages ORDER BY id"),
+                         [(1, 'Llwydiarth', 1), (2, 'Tyddyn', 0), (3, 'Bryn', 0)])
+        self.assertEqual(self.rows("SELECT id, cottage_id FROM comments ORDER BY id"), [(1, 1), (2, 2)])
+        self.assertEqual(self.rows("SELECT id, cottage_id FROM votes ORDER BY id"), [(1, 1)])
+        self.assertEqual(self.rows("SELECT id, cottage_id, rating FROM ratings ORDER BY id"),
+                         [(1, 1, 4), (2, 1, 6), (3, 2, 5)])
+
+    def test_rating_columns_backfilled(self):
+        self.assertEqual(self.rows("SELECT id, rating_sum, rating_count FROM cottages ORDER BY id"),
+                         [(1, 10, 2), (2, 5, 1), (3, 0, 0)])
+
+    def test_sequences_preserved(self):
+        self.assertEqual(dict(self.rows("SELECT name, seq FROM sqlite_sequence WHERE name != 'cottages'")),
+                         {'comments': 20, 'votes': 30, 'ratings': 40})
+
+    def test_schema_matches_current(self):
+        self.assertEqual(self.rows("PRAGMA foreign_key_check"), [])
+        self.assertTrue(any(r['name'] == 'id' and r['pk'] for r in self.db.execute("PRAGMA table_info(cottages)")))
+        for table in ('comments', 'votes', 'ratings'):
+            with self.subTest(table=table):
+                fks = self.db.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+                self.assertEqual([fk['on_delete'] for fk in fks], ['CASCADE'])
+        # the triggers dropped with the old tables are back
+        self.db.execute("INSERT INTO ratings (cottage_id, user_name, rating) VALUES (3, 'a', 7)")
+        self.assertEqual(self.rows("SELECT rating_sum, rating_count FROM cottages WHERE id = 3"), [(7, 1)])
+        self.db.rollback()
+
+    def test_delete_cascades(self):
+        with cottage_app.writer_transaction(self.db):
+            self.db.execute("DELETE FROM cottages WHERE id = 1")
+        for table in ('comments', 'votes', 'ratings'):
+            with self.subTest(table=table):
+                self.assertEqual(self.rows(f"SELECT id FROM {table} WHERE cottage_id = 1"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()